@@ -0,0 +1,260 @@
+import math
+import os
+import sys
+import time
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from models import Transaction, TransactionStatus
+
+# Transactions scoring above this count as anomalies (same cut the SQL history uses)
+ANOMALY_THRESHOLD = 0.8
+
+# Recent counterparties remembered per entity for the "new counterparty" feature
+PEER_SLOTS = 8
+# Time constant (seconds) of the exponentially-decayed velocity counters
+VELOCITY_TAU = 60.0
+# A sender is "fast" above this multiple of the average active sender's decayed count...
+VELOCITY_RATIO = 4.0
+# ...and never below this absolute decayed count (keeps low-traffic noise out)
+VELOCITY_FLOOR = 3.0
+# Samples needed before an entity's amount statistics are trusted
+MIN_HISTORY = 5
+# Samples, and share of recent payments to already-known counterparties, before a
+# sender's counterparty set counts as stable enough for "new counterparty" to mean anything
+MIN_PEER_HISTORY = 20
+STABLE_PEER_RATIO = 0.5
+# Smoothing factor of the known-counterparty ratio
+PEER_ALPHA = 0.1
+
+# Feature weights — each feature is normalized to [0, 1] before weighting
+W_AMOUNT_Z = 0.55
+W_VELOCITY = 0.25
+W_NEW_PEER = 0.10
+W_RECEIVER_Z = 0.30
+
+
+class EntityState:
+    """Rolling features for one sender or receiver.
+
+    Amount mean/variance use Welford's online update; velocity is a single
+    decayed counter; recent counterparties live in a fixed-size ring of
+    hashes next to a smoothed ratio of payments that went to one of them,
+    so every entry has the same small, constant footprint.
+    """
+
+    __slots__ = ("n", "mean", "m2", "velocity", "last_seen", "peers", "peer_pos", "known_peer_ratio")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.velocity = 0.0
+        self.last_seen = 0.0
+        self.peers = array("q", bytes(8 * PEER_SLOTS))
+        self.peer_pos = 0
+        self.known_peer_ratio = 0.0
+
+    def amount_z(self, amount: float) -> float:
+        if self.n < MIN_HISTORY:
+            return 0.0
+        std = math.sqrt(self.m2 / (self.n - 1))
+        return (amount - self.mean) / std if std > 0 else 0.0
+
+    def decayed_velocity(self, now: float) -> float:
+        if self.last_seen == 0.0:
+            return 0.0
+        return self.velocity * math.exp(-max(0.0, now - self.last_seen) / VELOCITY_TAU)
+
+    def knows_peer(self, peer_hash: int) -> bool:
+        return peer_hash in self.peers
+
+    @property
+    def stable_peers(self) -> bool:
+        return self.n >= MIN_PEER_HISTORY and self.known_peer_ratio >= STABLE_PEER_RATIO
+
+    def update(self, amount: float, now: float, peer_hash: int):
+        self.n += 1
+        delta = amount - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (amount - self.mean)
+        self.velocity = self.decayed_velocity(now) + 1.0
+        self.last_seen = now
+        known = peer_hash in self.peers
+        self.known_peer_ratio += PEER_ALPHA * ((1.0 if known else 0.0) - self.known_peer_ratio)
+        if not known:
+            self.peers[self.peer_pos] = peer_hash
+            self.peer_pos = (self.peer_pos + 1) % PEER_SLOTS
+
+
+# Approximate bytes per store entry: state object, peer array, dict slot and a typical key
+_ENTRY_BYTES = (
+    sys.getsizeof(EntityState())
+    + sys.getsizeof(array("q", bytes(8 * PEER_SLOTS)))
+    + sys.getsizeof("Firstname Lastname")
+    + 100
+)
+
+
+class EntityStore:
+    """Bounded LRU + TTL map of entity key → ``EntityState``.
+
+    Entries are kept in access order, so both capacity and TTL eviction only
+    ever pop from the cold end.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, EntityState] = OrderedDict()
+        self.evicted = 0
+        self.expired = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str, now: float) -> EntityState:
+        """Return the state for ``key`` (fresh if unknown or expired), marking it recently used."""
+        entries = self._entries
+        state = entries.get(key)
+        if state is not None and now - state.last_seen <= self.ttl_seconds:
+            entries.move_to_end(key)
+            return state
+        if state is not None:
+            self.expired += 1
+            del entries[key]
+        self._expire(now)
+        while len(entries) >= self.max_entries:
+            entries.popitem(last=False)
+            self.evicted += 1
+        state = entries[key] = EntityState()
+        return state
+
+    def _expire(self, now: float, limit: int = 32):
+        """Drop up to ``limit`` expired entries from the cold end (amortized sweep)."""
+        entries = self._entries
+        cutoff = now - self.ttl_seconds
+        for _ in range(limit):
+            if not entries:
+                return
+            key, state = next(iter(entries.items()))
+            if state.last_seen >= cutoff:
+                return
+            del entries[key]
+            self.expired += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.evicted = 0
+        self.expired = 0
+
+    def approx_bytes(self) -> int:
+        return sys.getsizeof(self._entries) + len(self._entries) * _ENTRY_BYTES
+
+
+def _clip(value: float) -> float:
+    return 0.0 if value <= 0.0 else 1.0 if value >= 1.0 else value
+
+
+class AnomalyScorer:
+    """Streaming risk scorer sitting between generation and ingest.
+
+    Each transaction is scored from its sender's and receiver's rolling
+    features *before* they are updated with it, then ``tx.risk_score`` is
+    overwritten with the result so ingestion, broadcast and stats all see
+    the same value. Transactions scoring above ``ANOMALY_THRESHOLD`` are
+    marked ``flagged``; any other status is left exactly as it came in, so
+    replayed recordings keep their original statuses.
+
+    Velocity is judged against the average active sender's decayed count
+    rather than an absolute number, so overall traffic rate alone doesn't
+    move the anomaly rate.
+    """
+
+    def __init__(self, max_entities: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        max_entities = max_entities or int(os.getenv("SCORING_MAX_ENTITIES", "100000"))
+        ttl_seconds = ttl_seconds or float(os.getenv("SCORING_TTL_SECONDS", "3600"))
+        self.senders = EntityStore(max_entities, ttl_seconds)
+        self.receivers = EntityStore(max_entities, ttl_seconds)
+        self.total_scored = 0
+        self.total_anomalies = 0
+        self._total_ns = 0
+        self._global_velocity = 0.0   # decayed count of all transactions
+        self._global_seen = 0.0
+
+    def _expected_velocity(self, now: float) -> float:
+        """Decayed count an average active sender would have at ``now``."""
+        if self._global_seen == 0.0:
+            return 0.0
+        decayed = self._global_velocity * math.exp(-max(0.0, now - self._global_seen) / VELOCITY_TAU)
+        return decayed / max(1, len(self.senders))
+
+    def score(self, tx: Transaction, event_time: Optional[float] = None) -> float:
+        """Score ``tx`` in place and return its new risk score.
+
+        ``event_time`` is the transaction's epoch timestamp when the caller has
+        already parsed it; otherwise ``tx.timestamp`` is parsed here.
+        """
+        start = time.perf_counter_ns()
+        now = event_time if event_time is not None else datetime.fromisoformat(tx.timestamp).timestamp()
+        amount = tx.amount
+
+        sender = self.senders.get(tx.sender, now)
+        receiver = self.receivers.get(tx.receiver, now)
+        receiver_hash = hash(tx.receiver)
+        sender_hash = hash(tx.sender)
+
+        amount_z = _clip((sender.amount_z(amount) - 2.0) / 4.0)
+        receiver_z = _clip((receiver.amount_z(amount) - 2.0) / 4.0)
+        fast = max(VELOCITY_FLOOR, VELOCITY_RATIO * self._expected_velocity(now))
+        velocity = _clip((sender.decayed_velocity(now) - fast) / fast)
+        new_peer = 1.0 if sender.stable_peers and not sender.knows_peer(receiver_hash) else 0.0
+
+        risk = round(_clip(
+            W_AMOUNT_Z * amount_z
+            + W_RECEIVER_Z * receiver_z
+            + W_VELOCITY * velocity
+            + W_NEW_PEER * new_peer
+        ), 3)
+
+        sender.update(amount, now, receiver_hash)
+        receiver.update(amount, now, sender_hash)
+        self._global_velocity = (
+            self._global_velocity * math.exp(-max(0.0, now - self._global_seen) / VELOCITY_TAU) + 1.0
+            if self._global_seen else 1.0
+        )
+        self._global_seen = max(self._global_seen, now)
+
+        tx.risk_score = risk
+        self.total_scored += 1
+        if risk > ANOMALY_THRESHOLD:
+            self.total_anomalies += 1
+            tx.status = TransactionStatus.FLAGGED
+        self._total_ns += time.perf_counter_ns() - start
+        return risk
+
+    def reset(self):
+        self.senders.clear()
+        self.receivers.clear()
+        self.total_scored = 0
+        self.total_anomalies = 0
+        self._total_ns = 0
+        self._global_velocity = 0.0
+        self._global_seen = 0.0
+
+    def get_metrics(self) -> dict:
+        """Scoring throughput and state-store footprint."""
+        avg_us = self._total_ns / self.total_scored / 1000 if self.total_scored else 0.0
+        return {
+            "total_scored": self.total_scored,
+            "total_anomalies": self.total_anomalies,
+            "avg_score_us": round(avg_us, 2),
+            "max_scores_per_sec": round(1_000_000 / avg_us) if avg_us else 0,
+            "tracked_senders": len(self.senders),
+            "tracked_receivers": len(self.receivers),
+            "evicted": self.senders.evicted + self.receivers.evicted,
+            "expired": self.senders.expired + self.receivers.expired,
+            "state_bytes": self.senders.approx_bytes() + self.receivers.approx_bytes(),
+        }
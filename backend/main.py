@@ -5,15 +5,21 @@ import logging
 import random
 import time
 from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
 from typing import Optional
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import ValidationError
 
-from models import Transaction
+from models import Subscription, Transaction
 from transaction_generator import generate_transaction
 from databricks_sql import DatabricksSQLClient
 from zerobus_client import ZeroBusClient
+from wire_format import FORMAT_COLUMNAR, ColumnarEncoder, parse_wire_format
+from subscriptions import FeedFilter
+from anomaly_scoring import ANOMALY_THRESHOLD, AnomalyScorer
+from replay_source import ReplayError, ReplaySource, resolve_recording
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -21,11 +27,22 @@ logger = logging.getLogger(__name__)
 # ---------------------------------------------------------------------------
 # State
 # ---------------------------------------------------------------------------
+@dataclass(eq=False)
+class FeedClient:
+    """A connected /ws client, the wire format it negotiated and its subscription."""
+    ws: WebSocket
+    format: str
+    encoder: Optional[ColumnarEncoder] = None
+    filter: FeedFilter = field(default_factory=FeedFilter)
+
+
 zerobus = ZeroBusClient()
 db_sql = DatabricksSQLClient()
-connected_ws: list[WebSocket] = []
+scorer = AnomalyScorer()
+connected_ws: list[FeedClient] = []
 running = False
 task: Optional[asyncio.Task] = None
+replay: Optional[ReplaySource] = None  # set while a recording drives the pipeline
 
 # Throttle: 1 (slowest) to 100 (fastest)
 # Maps to batch_size and sleep interval in the generation loop
@@ -69,19 +86,75 @@ app.add_middleware(
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
-async def broadcast(tx: Transaction):
-    payload = tx.model_dump_json()
-    stale: list[WebSocket] = []
-    for ws in connected_ws:
+async def broadcast(batch: list[Transaction]):
+    """Send one generation tick's transactions to every client in its own format."""
+    if not batch:
+        return
+    json_payloads: dict[str, str] = {}  # tx id → JSON, serialized at most once per tick
+    stale: list[FeedClient] = []
+    for client in list(connected_ws):
+        # Filter/sample before serializing so work scales with what the client displays
+        selected = client.filter.select(batch)
+        if not selected:
+            continue
+        if client.format == FORMAT_COLUMNAR:
+            try:
+                frame = client.encoder.encode(selected)
+            except Exception as e:
+                # The encoder's dictionaries/deflate stream are now out of sync with
+                # the client; close so it reconnects with a fresh encoder
+                logger.error(f"Columnar encoding failed, closing client: {e}")
+                stale.append(client)
+                try:
+                    await client.ws.close(code=1011)
+                except Exception:
+                    pass
+                continue
         try:
-            await ws.send_text(payload)
+            if client.format == FORMAT_COLUMNAR:
+                await client.ws.send_bytes(frame)
+            else:
+                for tx in selected:
+                    payload = json_payloads.get(tx.id)
+                    if payload is None:
+                        payload = json_payloads[tx.id] = tx.model_dump_json()
+                    await client.ws.send_text(payload)
         except Exception:
-            stale.append(ws)
-    for ws in stale:
-        connected_ws.remove(ws)
+            stale.append(client)
+    for client in stale:
+        if client in connected_ws:
+            connected_ws.remove(client)
+
+
+async def process_batch(
+    batch: list[Transaction], zb_connected: bool, event_times: Optional[list[float]] = None
+):
+    """Score, count, ingest and broadcast one batch — shared by every traffic source.
+
+    ``event_times`` carries already-parsed epoch timestamps (replay) so they aren't re-parsed.
+    """
+    for i, tx in enumerate(batch):
+        # Replaces risk_score with the streaming model's score
+        scorer.score(tx, event_times[i] if event_times is not None else None)
+
+        # Update stats
+        stats["total_count"] += 1
+        stats["total_volume"] += tx.amount
+        tx_timestamps.append(time.time())
+        if tx.risk_score > ANOMALY_THRESHOLD:
+            stats["anomaly_count"] += 1
+
+        # Ingest to Databricks (non-blocking - returns immediately)
+        if zb_connected:
+            record = json.loads(tx.model_dump_json())
+            await zerobus.ingest_async(record)  # Non-blocking!
+
+    # Broadcast to WebSocket clients (columnar clients get one frame per tick)
+    await broadcast(batch)
 
 
-async def generation_loop():
+async def generation_loop(source: Optional[ReplaySource] = None):
+    """Drive the pipeline from the synthetic generator, or from ``source`` when replaying."""
     global running
     zb_connected = zerobus.connect()
     if zb_connected:
@@ -91,34 +164,32 @@ async def generation_loop():
         logger.info("Running in demo mode — transactions broadcast via WebSocket only")
 
     try:
+        if source is not None:
+            async for batch, event_times in source.batches():
+                if not running:
+                    break
+                await process_batch(batch, zb_connected, event_times)
+            else:
+                logger.info(f"Replay finished: {source.get_metrics()}")
+            return
+
         while running:
             # throttle 1-100 → batch 1-10, sleep 1.0-0.02s
             t = max(1, min(100, throttle))
             batch_size = max(1, t // 10)
             sleep_time = max(0.02, 1.0 - (t - 1) * 0.98 / 99)
 
-            for _ in range(batch_size):
-                if not running:
-                    break
-                tx = generate_transaction()
-
-                # Update stats
-                stats["total_count"] += 1
-                stats["total_volume"] += tx.amount
-                tx_timestamps.append(time.time())
-                if tx.risk_score > 0.8:
-                    stats["anomaly_count"] += 1
-
-                # Ingest to Databricks (non-blocking - returns immediately)
-                if zb_connected:
-                    record = json.loads(tx.model_dump_json())
-                    await zerobus.ingest_async(record)  # Non-blocking!
-
-                # Broadcast to WebSocket clients
-                await broadcast(tx)
+            batch = [generate_transaction() for _ in range(batch_size)]
+            await process_batch(batch, zb_connected)
 
             await asyncio.sleep(sleep_time)
+    except Exception as e:
+        logger.exception(f"Generation loop failed: {e}")
     finally:
+        # A finished or failed run must never leave /api/start stuck on
+        # "already_running"; a task superseded by stop/start leaves state alone
+        if task is asyncio.current_task():
+            running = False
         if zb_connected:
             await zerobus.stop_ack_worker()
         zerobus.close()
@@ -137,10 +208,21 @@ def stop_generation():
 # REST endpoints
 # ---------------------------------------------------------------------------
 @app.post("/api/start")
-async def start():
-    global running, task, stats, _ema_rate, tx_timestamps
+async def start(replay_file: Optional[str] = None, speed: float = 1.0):
+    """Start streaming synthetic traffic, or replay a recording from ``REPLAY_DIR``.
+
+    ``speed`` scales recorded timing (1 = original, 10 = 10x faster, 0 = as fast as possible).
+    """
+    global running, task, stats, _ema_rate, tx_timestamps, replay
     if running:
         return {"status": "already_running"}
+    source = None
+    if replay_file:
+        try:
+            source = ReplaySource(resolve_recording(replay_file), speed=speed)
+        except ReplayError as e:
+            return {"error": str(e)}
+    replay = source
     stats = {
         "total_count": 0,
         "total_volume": 0.0,
@@ -149,10 +231,11 @@ async def start():
         "ingested_to_databricks": 0,
     }
     tx_timestamps.clear()
+    scorer.reset()
     _ema_rate = 0.0
     running = True
-    task = asyncio.create_task(generation_loop())
-    return {"status": "started"}
+    task = asyncio.create_task(generation_loop(source))
+    return {"status": "started", "source": "replay" if source else "synthetic"}
 
 
 @app.post("/api/stop")
@@ -204,6 +287,8 @@ async def get_stats():
         "elapsed_seconds": elapsed_seconds,
         "running": running,
         "ingestion": ingestion_metrics,
+        "scoring": scorer.get_metrics(),
+        "replay": replay.get_metrics() if replay else None,
         "ingested_to_databricks": ingestion_metrics.get("total_ingested", 0),
     }
 
@@ -317,16 +402,42 @@ async def history_clear():
 # WebSocket
 # ---------------------------------------------------------------------------
 @app.websocket("/ws")
-async def websocket_endpoint(ws: WebSocket):
+async def websocket_endpoint(ws: WebSocket, format: str = "json"):
+    """Live transaction feed. ``?format=columnar`` opts into batched binary frames.
+
+    Clients may send a ``Subscription`` as JSON (text or UTF-8 bytes) at any
+    time to filter/sample the feed; anything else is logged and ignored.
+    """
     await ws.accept()
-    connected_ws.append(ws)
+    wire_format = parse_wire_format(format)
+    client = FeedClient(
+        ws=ws,
+        format=wire_format,
+        encoder=ColumnarEncoder() if wire_format == FORMAT_COLUMNAR else None,
+    )
+    connected_ws.append(client)
     logger.info(f"WebSocket client connected ({len(connected_ws)} total)")
     try:
         while True:
-            await ws.receive_text()  # keep-alive; we don't expect client msgs
+            message = await ws.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            data = message.get("text")
+            if data is None:
+                data = message.get("bytes")
+            if data is None:
+                logger.warning(f"Ignoring unexpected WebSocket message: {message['type']}")
+                continue
+            try:
+                subscription = Subscription.model_validate_json(data)
+            except ValidationError as e:
+                logger.warning(f"Ignoring invalid WebSocket subscription: {e}")
+                continue
+            client.filter = FeedFilter(subscription)
+            logger.info(f"WebSocket subscription updated: {subscription.model_dump(exclude_none=True)}")
     except WebSocketDisconnect:
         pass
     finally:
-        if ws in connected_ws:
-            connected_ws.remove(ws)
+        if client in connected_ws:
+            connected_ws.remove(client)
         logger.info(f"WebSocket client disconnected ({len(connected_ws)} total)")
@@ -1,6 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from enum import Enum
+from typing import Optional
 
 
 class TransactionType(str, Enum):
@@ -28,3 +29,17 @@ class Transaction(BaseModel):
     status: TransactionStatus
     category: str
     risk_score: float
+
+
+class Subscription(BaseModel):
+    """Live-feed subscription a /ws client sends as a JSON text message.
+
+    Unset filters match everything. Sampling (keep 1-in-N) and the rate cap
+    are applied after filtering, so they shape what the client actually sees.
+    """
+    types: Optional[list[TransactionType]] = None
+    statuses: Optional[list[TransactionStatus]] = None
+    currencies: Optional[list[str]] = None
+    min_risk: Optional[float] = Field(default=None, ge=0.0, le=1.0)
+    sample_every: int = Field(default=1, ge=1)
+    max_rate: Optional[float] = Field(default=None, gt=0)  # transactions/sec
@@ -0,0 +1,233 @@
+import asyncio
+import gzip
+import importlib.util
+import json
+import logging
+import math
+import mmap
+import os
+import time
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncIterator, Iterator, Optional
+
+from models import Transaction, TransactionStatus, TransactionType
+
+logger = logging.getLogger(__name__)
+
+# Recordings are only read from inside this directory
+REPLAY_DIR = Path(os.getenv("REPLAY_DIR", Path(__file__).parent / "recordings")).resolve()
+
+CHUNK_BYTES = 256 * 1024   # decompressed bytes parsed per step
+MAX_BATCH = 500            # max transactions handed to the pipeline at once
+
+_TYPES = {t.value: t for t in TransactionType}
+_STATUSES = {s.value: s for s in TransactionStatus}
+
+
+class ReplayError(Exception):
+    """Raised when a recording can't be opened for replay."""
+
+
+def resolve_recording(name: str) -> Path:
+    """Resolve ``name`` inside ``REPLAY_DIR``, rejecting paths that escape it."""
+    path = (REPLAY_DIR / name).resolve()
+    if not path.is_relative_to(REPLAY_DIR):
+        raise ReplayError(f"Recording must live under {REPLAY_DIR}")
+    if not path.is_file():
+        raise ReplayError(f"Recording not found: {name}")
+    return path
+
+
+_STRING_FIELDS = ("id", "timestamp", "sender", "receiver", "currency", "category")
+
+
+def _number(value) -> float:
+    # bool is an int subclass; NaN/inf would poison the scorer's running statistics
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"not a finite number: {value!r}")
+    return float(value)
+
+
+def _to_transaction(record: dict) -> tuple[Transaction, float]:
+    """Build a Transaction plus its epoch timestamp; raises on malformed records.
+
+    Full pydantic validation is skipped for speed, so every field is checked
+    here instead: downstream stages (scorer, filters, encoders) must never
+    see a record of the wrong shape.
+    """
+    if not isinstance(record, dict):
+        raise TypeError("record is not a JSON object")
+    for name in _STRING_FIELDS:
+        if not isinstance(record[name], str):
+            raise TypeError(f"{name} must be a string")
+    event_time = datetime.fromisoformat(record["timestamp"])
+    if event_time.tzinfo is None:
+        event_time = event_time.replace(tzinfo=timezone.utc)
+    tx = Transaction.model_construct(
+        id=record["id"],
+        timestamp=record["timestamp"],
+        sender=record["sender"],
+        receiver=record["receiver"],
+        amount=_number(record["amount"]),
+        currency=record["currency"],
+        type=_TYPES[record["type"]],
+        status=_STATUSES[record["status"]],
+        category=record["category"],
+        risk_score=_number(record.get("risk_score", 0.0)),
+    )
+    return tx, event_time.timestamp()
+
+
+class ReplaySource:
+    """Replay a recorded NDJSON transaction file (plain, ``.gz`` or ``.zst``).
+
+    The file is memory-mapped and decoded in fixed-size chunks; every chunk's
+    complete lines are parsed with a single ``json.loads`` call rather than
+    one per line. ``speed`` scales the recorded inter-arrival times
+    (1.0 = original timing, 10.0 = ten times faster, 0 = as fast as possible).
+    """
+
+    def __init__(self, path: Path, speed: float = 1.0):
+        if not math.isfinite(speed) or speed < 0:
+            raise ReplayError(f"speed must be a finite number >= 0 (0 = as fast as possible), got {speed}")
+        self.path = path
+        self.speed = speed
+        if path.suffix.lower() in (".zst", ".zstd") and importlib.util.find_spec("zstandard") is None:
+            raise ReplayError("Replaying .zst recordings requires the 'zstandard' package")
+        self.total_bytes = path.stat().st_size
+        self.bytes_read = 0
+        self.records = 0
+        self.parse_errors = 0
+        self.lag_ms = 0.0
+        self.done = False
+        self.error: Optional[str] = None
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+
+    def _read_errors(self) -> tuple[type[BaseException], ...]:
+        """Exceptions that mean the (compressed) file is corrupt or truncated."""
+        errors: tuple[type[BaseException], ...] = (EOFError, zlib.error, gzip.BadGzipFile)
+        if self.path.suffix.lower() in (".zst", ".zstd"):
+            import zstandard
+            errors += (zstandard.ZstdError,)
+        return errors
+
+    def _open_stream(self, mm: mmap.mmap):
+        suffix = self.path.suffix.lower()
+        if suffix == ".gz":
+            return gzip.GzipFile(fileobj=mm)
+        if suffix in (".zst", ".zstd"):
+            import zstandard
+            return zstandard.ZstdDecompressor().stream_reader(mm, read_across_frames=True)
+        return mm
+
+    def _chunks(self) -> Iterator[bytes]:
+        """Yield decompressed chunks that always end on a line boundary."""
+        if self.total_bytes == 0:
+            return
+        read_errors = self._read_errors()
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            stream = self._open_stream(mm)
+            tail = b""
+            while True:
+                try:
+                    data = stream.read(CHUNK_BYTES)
+                except read_errors as e:
+                    # Replay what decoded cleanly, then stop
+                    self.error = f"{type(e).__name__}: {e}"
+                    logger.error(f"Replay of {self.path.name} stopped: corrupt or truncated file ({self.error})")
+                    break
+                self.bytes_read = mm.tell()
+                if not data:
+                    break
+                data = tail + data
+                cut = data.rfind(b"\n")
+                if cut == -1:
+                    tail = data
+                    continue
+                tail = data[cut + 1:]
+                yield data[:cut]
+            if tail.strip():
+                yield tail
+
+    def _parse(self, chunk: bytes) -> tuple[list[Transaction], list[float]]:
+        lines = [line for line in chunk.split(b"\n") if line.strip()]
+        try:
+            records = json.loads(b"[" + b",".join(lines) + b"]")
+        except ValueError:
+            # A bad line poisons the whole chunk; fall back to per-line parsing
+            records = []
+            for line in lines:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    self.parse_errors += 1
+        txs: list[Transaction] = []
+        event_times: list[float] = []
+        for record in records:
+            try:
+                tx, event_time = _to_transaction(record)
+            except (KeyError, TypeError, ValueError):
+                self.parse_errors += 1
+                continue
+            txs.append(tx)
+            event_times.append(event_time)
+        return txs, event_times
+
+    async def batches(self) -> AsyncIterator[tuple[list[Transaction], list[float]]]:
+        """Yield ``(transactions, epoch timestamps)`` batches paced to the recording."""
+        self._started = time.monotonic()
+        base_event: Optional[float] = None
+        try:
+            for chunk in self._chunks():
+                txs, event_times = self._parse(chunk)
+                self.records += len(txs)
+                if self.speed == 0:
+                    for i in range(0, len(txs), MAX_BATCH):
+                        yield txs[i:i + MAX_BATCH], event_times[i:i + MAX_BATCH]
+                        await asyncio.sleep(0)  # don't starve the event loop
+                    continue
+
+                if base_event is None and event_times:
+                    base_event = event_times[0]
+                i = 0
+                while i < len(txs):
+                    due = self._started + (event_times[i] - base_event) / self.speed
+                    delay = due - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    now = time.monotonic()
+                    self.lag_ms = max(0.0, (now - due) * 1000)
+                    # Everything else already due goes out in the same batch
+                    j = i + 1
+                    while (
+                        j < len(txs)
+                        and j - i < MAX_BATCH
+                        and self._started + (event_times[j] - base_event) / self.speed <= now
+                    ):
+                        j += 1
+                    yield txs[i:j], event_times[i:j]
+                    i = j
+            self.done = True
+        finally:
+            self._finished = time.monotonic()
+
+    def get_metrics(self) -> dict:
+        """Replay progress and read throughput."""
+        elapsed = 0.0
+        if self._started is not None:
+            elapsed = (self._finished or time.monotonic()) - self._started
+        return {
+            "file": self.path.name,
+            "speed": self.speed,
+            "records": self.records,
+            "parse_errors": self.parse_errors,
+            "bytes_read": self.bytes_read,
+            "total_bytes": self.total_bytes,
+            "records_per_sec": round(self.records / elapsed, 1) if elapsed > 0 else 0,
+            "lag_ms": round(self.lag_ms, 1),
+            "done": self.done,
+            "error": self.error,
+        }
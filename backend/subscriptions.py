@@ -0,0 +1,81 @@
+import time
+from typing import Callable, Optional
+
+from models import Subscription, Transaction
+
+Predicate = Callable[[Transaction], bool]
+
+
+def compile_predicate(sub: Subscription) -> Optional[Predicate]:
+    """Turn a subscription's filters into a single predicate (None = match all).
+
+    Only the filters the client actually set become checks, and list filters
+    are frozen into sets up front, so the per-transaction cost is a few
+    attribute lookups and set probes.
+    """
+    checks: list[Predicate] = []
+    if sub.types is not None:
+        types = frozenset(sub.types)
+        checks.append(lambda tx: tx.type in types)
+    if sub.statuses is not None:
+        statuses = frozenset(sub.statuses)
+        checks.append(lambda tx: tx.status in statuses)
+    if sub.currencies is not None:
+        currencies = frozenset(c.upper() for c in sub.currencies)
+        checks.append(lambda tx: tx.currency in currencies)
+    if sub.min_risk is not None:
+        min_risk = sub.min_risk
+        checks.append(lambda tx: tx.risk_score >= min_risk)
+
+    if not checks:
+        return None
+    if len(checks) == 1:
+        return checks[0]
+    return lambda tx: all(check(tx) for check in checks)
+
+
+class FeedFilter:
+    """Per-client selection stage applied to each broadcast batch before serialization."""
+
+    __slots__ = ("subscription", "_predicate", "_sample_every", "_sample_pos",
+                 "_max_rate", "_tokens", "_last_refill")
+
+    def __init__(self, sub: Optional[Subscription] = None):
+        self.subscription = sub or Subscription()
+        self._predicate = compile_predicate(self.subscription)
+        self._sample_every = self.subscription.sample_every
+        self._sample_pos = 0
+        self._max_rate = self.subscription.max_rate
+        # Token bucket: refills at max_rate/sec with up to one second of burst
+        self._tokens = max(1.0, self._max_rate) if self._max_rate else 0.0
+        self._last_refill = time.monotonic()
+
+    @property
+    def passthrough(self) -> bool:
+        return self._predicate is None and self._sample_every == 1 and self._max_rate is None
+
+    def select(self, batch: list[Transaction]) -> list[Transaction]:
+        """Return the subset of ``batch`` this client should receive."""
+        if self.passthrough:
+            return batch
+
+        selected = batch if self._predicate is None else [tx for tx in batch if self._predicate(tx)]
+
+        if self._sample_every > 1 and selected:
+            # Keep every Nth match, carrying the phase across batches
+            n = self._sample_every
+            offset = (n - self._sample_pos) % n
+            self._sample_pos = (self._sample_pos + len(selected)) % n
+            selected = selected[offset::n]
+
+        if self._max_rate is not None and selected:
+            now = time.monotonic()
+            capacity = max(1.0, self._max_rate)
+            self._tokens = min(capacity, self._tokens + (now - self._last_refill) * self._max_rate)
+            self._last_refill = now
+            allowed = int(self._tokens)
+            if allowed < len(selected):
+                selected = selected[:allowed]
+            self._tokens -= len(selected)
+
+        return selected
@@ -49,23 +49,17 @@ def generate_transaction() -> Transaction:
     currency = random.choices(CURRENCIES, weights=CURRENCY_WEIGHTS, k=1)[0]
     amount = _random_amount()
 
+    # Inject outsized amounts; risk_score and the flagged status are decided
+    # downstream by AnomalyScorer, not here
     is_anomalous = random.random() < 0.05
-    if is_anomalous:
-        risk_score = round(random.uniform(0.8, 1.0), 3)
-        status = random.choices(
-            [TransactionStatus.FLAGGED, TransactionStatus.FAILED],
-            weights=[0.7, 0.3],
-            k=1,
-        )[0]
-        if random.random() < 0.5:
-            amount = round(random.uniform(20000, 50000), 2)
-    else:
-        risk_score = round(random.uniform(0.0, 0.3), 3)
-        status = random.choices(
-            [TransactionStatus.COMPLETED, TransactionStatus.PENDING, TransactionStatus.FAILED],
-            weights=[0.75, 0.20, 0.05],
-            k=1,
-        )[0]
+    if is_anomalous and random.random() < 0.5:
+        amount = round(random.uniform(20000, 50000), 2)
+
+    status = random.choices(
+        [TransactionStatus.COMPLETED, TransactionStatus.PENDING, TransactionStatus.FAILED],
+        weights=[0.75, 0.20, 0.05],
+        k=1,
+    )[0]
 
     sender = _random_name()
     receiver = _random_name()
@@ -82,5 +76,5 @@ def generate_transaction() -> Transaction:
         type=tx_type,
         status=status,
         category=random.choice(CATEGORIES),
-        risk_score=risk_score,
+        risk_score=0.0,
     )
@@ -0,0 +1,179 @@
+import json
+import struct
+import uuid
+import zlib
+from datetime import datetime, timedelta, timezone
+
+from models import Transaction, TransactionType, TransactionStatus
+
+# Wire formats a /ws client can negotiate via ?format=...
+FORMAT_JSON = "json"            # one pydantic JSON text frame per transaction (default)
+FORMAT_COLUMNAR = "columnar"    # one deflated columnar binary frame per generation tick
+WIRE_FORMATS = (FORMAT_JSON, FORMAT_COLUMNAR)
+
+WIRE_VERSION = 2
+
+# Enums are sent as their index in these tables; the tables ship with every reset frame
+TYPE_TABLE = [t.value for t in TransactionType]
+STATUS_TABLE = [s.value for s in TransactionStatus]
+_TYPE_CODES = {value: i for i, value in enumerate(TYPE_TABLE)}
+_STATUS_CODES = {value: i for i, value in enumerate(STATUS_TABLE)}
+
+# Once any dictionary grows past this, both sides start over (bounds per-client memory)
+MAX_DICT_ENTRIES = 4096
+
+# Frame prefix: JSON section length, binary id-block length (both big-endian uint32)
+_FRAME_HEADER = struct.Struct(">II")
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ONE_US = timedelta(microseconds=1)
+
+
+def parse_wire_format(value: str | None) -> str:
+    """Normalize a client-requested format, falling back to plain JSON."""
+    value = (value or FORMAT_JSON).lower()
+    return value if value in WIRE_FORMATS else FORMAT_JSON
+
+
+def _split_timestamp(timestamp: str) -> tuple[int, str]:
+    """Return (UTC epoch microseconds, ISO offset suffix) for an ISO timestamp.
+
+    Naive timestamps are treated as UTC and get an empty suffix.
+    """
+    dt = datetime.fromisoformat(timestamp)
+    if dt.tzinfo is None:
+        return (dt.replace(tzinfo=timezone.utc) - _EPOCH) // _ONE_US, ""
+    suffix = dt.isoformat()[-6:] if dt.utcoffset() is not None else ""
+    return (dt - _EPOCH) // _ONE_US, suffix
+
+
+def _amount_column(batch: list[Transaction]) -> tuple[list, int]:
+    """Return (amounts, scale): integer cents when that's lossless, else raw floats."""
+    cents = [round(tx.amount * 100) for tx in batch]
+    if all(c / 100 == tx.amount for c, tx in zip(cents, batch)):
+        return cents, 100
+    return [tx.amount for tx in batch], 1
+
+
+def _pack_ids(batch: list[Transaction]) -> bytes | None:
+    """Pack canonical UUID ids as 16 raw bytes each, or None if any id isn't one."""
+    try:
+        packed = [uuid.UUID(tx.id) for tx in batch]
+    except ValueError:
+        return None
+    if any(str(u) != tx.id for u, tx in zip(packed, batch)):
+        return None
+    return b"".join(u.bytes for u in packed)
+
+
+class _StringDictionary:
+    """Append-only string → code table that remembers entries not yet sent."""
+
+    __slots__ = ("codes", "pending")
+
+    def __init__(self):
+        self.codes: dict[str, int] = {}
+        self.pending: list[str] = []
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.codes)
+            self.codes[value] = code
+            self.pending.append(value)
+        return code
+
+    def take_pending(self) -> list[str]:
+        pending, self.pending = self.pending, []
+        return pending
+
+    def clear(self):
+        self.codes.clear()
+        self.pending.clear()
+
+
+class ColumnarEncoder:
+    """Encode transaction batches into compact columnar frames for one connection.
+
+    Dictionaries are stateful per connection: each frame only carries the
+    dictionary entries the client hasn't seen yet, so steady-state frames are
+    just integer columns. Amounts are sent in cents (``amount_scale`` 100)
+    unless some amount in the batch isn't a whole number of cents, in which
+    case the column carries the raw floats (``amount_scale`` 1); risk scores,
+    which the scorer always rounds to 3 places, go in thousandths.
+    Timestamps travel as UTC epoch microseconds plus a dictionary-coded
+    offset suffix, from which the client rebuilds the
+    ``datetime.isoformat()`` spelling the JSON feed uses (exact for generated
+    records; replayed timestamps in other ISO spellings come back normalized).
+
+    Every frame is ``[json_len][ids_len][json][ids]`` pushed through a single
+    per-connection deflate stream and ended with ``Z_SYNC_FLUSH``, so the
+    compressor's window carries over between frames and the client inflates
+    the whole connection with one long-lived decompressor. Canonical UUID ids
+    go in the trailing block as 16 raw bytes each; anything else falls back
+    to an ``id`` string column in the JSON section.
+    """
+
+    def __init__(self, compress_level: int = 6):
+        self._compressor = zlib.compressobj(compress_level)
+        self._names = _StringDictionary()       # shared by sender + receiver
+        self._categories = _StringDictionary()
+        self._currencies = _StringDictionary()
+        self._offsets = _StringDictionary()
+        self._needs_reset = True
+
+    def _maybe_reset(self):
+        dictionaries = (self._names, self._categories, self._currencies, self._offsets)
+        if self._needs_reset or max(len(d.codes) for d in dictionaries) > MAX_DICT_ENTRIES:
+            for d in dictionaries:
+                d.clear()
+            self._needs_reset = True
+
+    def encode(self, batch: list[Transaction]) -> bytes:
+        """Build the compressed bytes for one frame holding every transaction in ``batch``."""
+        self._maybe_reset()
+
+        ts: list[int] = []
+        offsets: list[int] = []
+        for tx in batch:
+            epoch_us, suffix = _split_timestamp(tx.timestamp)
+            ts.append(epoch_us)
+            offsets.append(self._offsets.code(suffix))
+        ts0 = ts[0] if ts else 0
+        amounts, amount_scale = _amount_column(batch)
+        name_code = self._names.code
+        frame = {
+            "v": WIRE_VERSION,
+            "n": len(batch),
+            "reset": self._needs_reset,
+            "ts0": ts0,
+            "ts": [t - ts0 for t in ts],
+            "tz": offsets,
+            "sender": [name_code(tx.sender) for tx in batch],
+            "receiver": [name_code(tx.receiver) for tx in batch],
+            "amount": amounts,
+            "amount_scale": amount_scale,
+            "currency": [self._currencies.code(tx.currency) for tx in batch],
+            "type": [_TYPE_CODES[tx.type.value] for tx in batch],
+            "status": [_STATUS_CODES[tx.status.value] for tx in batch],
+            "category": [self._categories.code(tx.category) for tx in batch],
+            "risk": [round(tx.risk_score * 1000) for tx in batch],
+            "dict": {
+                "name": self._names.take_pending(),
+                "category": self._categories.take_pending(),
+                "currency": self._currencies.take_pending(),
+                "tz": self._offsets.take_pending(),
+            },
+        }
+        if self._needs_reset:
+            frame["enums"] = {"type": TYPE_TABLE, "status": STATUS_TABLE}
+            self._needs_reset = False
+
+        ids = _pack_ids(batch)
+        if ids is None:
+            frame["id"] = [tx.id for tx in batch]
+            ids = b""
+
+        raw = json.dumps(frame, separators=(",", ":")).encode()
+        payload = _FRAME_HEADER.pack(len(raw), len(ids)) + raw + ids
+        return self._compressor.compress(payload) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
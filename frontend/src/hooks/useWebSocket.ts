@@ -1,25 +1,211 @@
 import { useCallback, useEffect, useRef, useState } from "react";
-import type { Transaction } from "../types/transaction";
+import type { Subscription, Transaction } from "../types/transaction";
 
 const MAX_BUFFER = 100;
 
-export function useWebSocket() {
+// Columnar binary frames need DecompressionStream; older browsers stay on JSON
+const WIRE_FORMAT =
+  typeof DecompressionStream !== "undefined" ? "columnar" : "json";
+
+interface ColumnarFrame {
+  v: number;
+  n: number;
+  reset: boolean;
+  id?: string[]; // only when ids aren't UUIDs; otherwise they trail the JSON as raw bytes
+  ts0: number;
+  ts: number[];
+  tz: number[];
+  sender: number[];
+  receiver: number[];
+  amount: number[];
+  amount_scale: number; // 100 = integer cents, 1 = raw floats
+  currency: number[];
+  type: number[];
+  status: number[];
+  category: number[];
+  risk: number[];
+  dict: { name: string[]; category: string[]; currency: string[]; tz: string[] };
+  enums?: { type: Transaction["type"][]; status: Transaction["status"][] };
+}
+
+interface ColumnarDictionaries {
+  name: string[];
+  category: string[];
+  currency: string[];
+  tz: string[];
+  type: Transaction["type"][];
+  status: Transaction["status"][];
+}
+
+function emptyDictionaries(): ColumnarDictionaries {
+  return { name: [], category: [], currency: [], tz: [], type: [], status: [] };
+}
+
+const HEX = Array.from({ length: 256 }, (_, i) => i.toString(16).padStart(2, "0"));
+
+function uuidFromBytes(bytes: Uint8Array, offset: number): string {
+  let s = "";
+  for (let i = 0; i < 16; i++) {
+    if (i === 4 || i === 6 || i === 8 || i === 10) s += "-";
+    s += HEX[bytes[offset + i]];
+  }
+  return s;
+}
+
+function offsetMinutes(suffix: string): number {
+  if (!suffix) return 0;
+  const sign = suffix[0] === "-" ? -1 : 1;
+  return sign * (Number(suffix.slice(1, 3)) * 60 + Number(suffix.slice(4, 6)));
+}
+
+// Rebuild Python's datetime.isoformat() spelling so both wire formats match
+function isoTimestamp(epochUs: number, suffix: string): string {
+  const wallUs = epochUs + offsetMinutes(suffix) * 60_000_000;
+  const seconds = Math.floor(wallUs / 1_000_000);
+  const micros = wallUs - seconds * 1_000_000;
+  const base = new Date(seconds * 1000).toISOString().slice(0, 19);
+  const frac = micros ? "." + String(micros).padStart(6, "0") : "";
+  return base + frac + suffix;
+}
+
+function decodeColumnar(
+  frame: ColumnarFrame,
+  ids: Uint8Array,
+  dicts: ColumnarDictionaries
+): Transaction[] {
+  if (frame.reset) {
+    Object.assign(dicts, emptyDictionaries());
+  }
+  if (frame.enums) {
+    dicts.type = frame.enums.type;
+    dicts.status = frame.enums.status;
+  }
+  dicts.name.push(...frame.dict.name);
+  dicts.category.push(...frame.dict.category);
+  dicts.currency.push(...frame.dict.currency);
+  dicts.tz.push(...frame.dict.tz);
+
+  const txs: Transaction[] = new Array(frame.n);
+  for (let i = 0; i < frame.n; i++) {
+    const tx: Transaction = {
+      id: frame.id ? frame.id[i] : uuidFromBytes(ids, i * 16),
+      timestamp: isoTimestamp(frame.ts0 + frame.ts[i], dicts.tz[frame.tz[i]]),
+      sender: dicts.name[frame.sender[i]],
+      receiver: dicts.name[frame.receiver[i]],
+      amount: frame.amount[i] / frame.amount_scale,
+      currency: dicts.currency[frame.currency[i]],
+      type: dicts.type[frame.type[i]],
+      status: dicts.status[frame.status[i]],
+      category: dicts.category[frame.category[i]],
+      risk_score: frame.risk[i] / 1000,
+    };
+    // A missing dictionary entry means we've lost sync with the server
+    if (
+      tx.sender === undefined ||
+      tx.receiver === undefined ||
+      tx.currency === undefined ||
+      tx.category === undefined ||
+      tx.type === undefined ||
+      tx.status === undefined
+    ) {
+      throw new Error("columnar frame references unknown dictionary entry");
+    }
+    txs[i] = tx;
+  }
+  return txs;
+}
+
+/**
+ * Inflate one connection's deflate stream with a single long-lived
+ * DecompressionStream and hand each complete [json_len][ids_len][json][ids]
+ * frame to `onFrame`. Rejects on any decode error.
+ */
+function columnarReader(onFrame: (frame: ColumnarFrame, ids: Uint8Array) => void) {
+  const inflater = new DecompressionStream("deflate");
+  const writer = inflater.writable.getWriter();
+  const reader = inflater.readable.getReader();
+  const text = new TextDecoder();
+  let pending = new Uint8Array(0);
+
+  const done = (async () => {
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) return;
+      const merged = new Uint8Array(pending.length + value.length);
+      merged.set(pending);
+      merged.set(value, pending.length);
+
+      let pos = 0;
+      while (merged.length - pos >= 8) {
+        const view = new DataView(merged.buffer, merged.byteOffset + pos, 8);
+        const jsonLen = view.getUint32(0);
+        const idsLen = view.getUint32(4);
+        const end = pos + 8 + jsonLen + idsLen;
+        if (merged.length < end) break;
+        const frame: ColumnarFrame = JSON.parse(
+          text.decode(merged.subarray(pos + 8, pos + 8 + jsonLen))
+        );
+        onFrame(frame, merged.subarray(pos + 8 + jsonLen, end));
+        pos = end;
+      }
+      pending = merged.slice(pos);
+    }
+  })();
+
+  return {
+    push: (data: ArrayBuffer) => writer.write(new Uint8Array(data)),
+    close: () => writer.abort().catch(() => {}),
+    done,
+  };
+}
+
+export function useWebSocket(subscription?: Subscription) {
   const [transactions, setTransactions] = useState<Transaction[]>([]);
   const [connected, setConnected] = useState(false);
   const wsRef = useRef<WebSocket | null>(null);
   const reconnectTimer = useRef<ReturnType<typeof setTimeout>>();
+  // Serialized so callers can pass inline objects without resubscribing every render
+  const subscriptionJson = subscription ? JSON.stringify(subscription) : null;
+  const subscriptionRef = useRef(subscriptionJson);
+  subscriptionRef.current = subscriptionJson;
 
   const connect = useCallback(() => {
     if (wsRef.current?.readyState === WebSocket.OPEN) return;
 
     const proto = window.location.protocol === "https:" ? "wss" : "ws";
-    const ws = new WebSocket(`${proto}://${window.location.host}/ws`);
+    const ws = new WebSocket(
+      `${proto}://${window.location.host}/ws?format=${WIRE_FORMAT}`
+    );
+    ws.binaryType = "arraybuffer";
+
+    const pushTransactions = (txs: Transaction[]) => {
+      if (txs.length === 0) return;
+      // Newest first, matching the per-message JSON path
+      const newest = txs.reverse();
+      setTransactions((prev) => [...newest, ...prev].slice(0, MAX_BUFFER));
+    };
+
+    // Dictionaries and the deflate stream are per connection. Any decode error
+    // desyncs them for good, so drop the socket and let the reconnect start fresh.
+    const dicts = emptyDictionaries();
+    const columnar =
+      WIRE_FORMAT === "columnar"
+        ? columnarReader((frame, ids) =>
+            pushTransactions(decodeColumnar(frame, ids, dicts))
+          )
+        : null;
+    columnar?.done.catch(() => ws.close());
 
     ws.onopen = () => {
       setConnected(true);
+      if (subscriptionRef.current) ws.send(subscriptionRef.current);
     };
 
     ws.onmessage = (event) => {
+      if (event.data instanceof ArrayBuffer) {
+        columnar?.push(event.data).catch(() => ws.close());
+        return;
+      }
       try {
         const tx: Transaction = JSON.parse(event.data);
         setTransactions((prev) => [tx, ...prev].slice(0, MAX_BUFFER));
@@ -29,6 +215,7 @@ export function useWebSocket() {
     };
 
     ws.onclose = () => {
+      columnar?.close();
       setConnected(false);
       wsRef.current = null;
       reconnectTimer.current = setTimeout(connect, 2000);
@@ -49,6 +236,14 @@ export function useWebSocket() {
     };
   }, [connect]);
 
+  useEffect(() => {
+    const ws = wsRef.current;
+    if (ws?.readyState === WebSocket.OPEN) {
+      // An empty subscription resets the server-side filter to "everything"
+      ws.send(subscriptionJson ?? "{}");
+    }
+  }, [subscriptionJson]);
+
   const clearTransactions = useCallback(() => setTransactions([]), []);
 
   return { transactions, connected, clearTransactions };
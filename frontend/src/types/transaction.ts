@@ -19,3 +19,13 @@ export interface Stats {
   tx_per_sec: number;
   ingested_to_databricks: number;
 }
+
+/** Server-side filter/sampling for the /ws feed; unset fields match everything. */
+export interface Subscription {
+  types?: Transaction["type"][];
+  statuses?: Transaction["status"][];
+  currencies?: string[];
+  min_risk?: number;
+  sample_every?: number;
+  max_rate?: number;
+}